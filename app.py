@@ -5,9 +5,12 @@ Run with: streamlit run app.py
 import streamlit as st
 import pandas as pd
 from models import Product
-from double_hashing import DoubleHashTable
+from double_hashing import DoubleHashTable, SLOT_EMPTY, SLOT_DELETED
 from database import DatabaseManager
 
+PRODUCTS_PER_PAGE = 50  # Rows shown per page in the product list
+COLLISION_LOGS_SHOWN = 10  # Most recent collision events rendered
+
 
 # Page configuration
 st.set_page_config(
@@ -23,6 +26,10 @@ st.markdown("""
     .stAlert {
         margin-top: 1rem;
     }
+    .hash-grid {
+        display: grid;
+        gap: 6px;
+    }
     .hash-slot {
         padding: 10px;
         border-radius: 5px;
@@ -55,9 +62,9 @@ def initialize_session_state():
         st.session_state.last_operation = None
 
 
-def create_new_table(size: int):
+def create_new_table(size: int, legacy_hash: bool = True):
     """Create a new hash table"""
-    st.session_state.hash_table = DoubleHashTable(size)
+    st.session_state.hash_table = DoubleHashTable(size, legacy_hash=legacy_hash)
     st.session_state.db_manager.save(st.session_state.hash_table)
     st.success(f"✅ Đã tạo Hash Table mới với kích thước {size}")
 
@@ -72,6 +79,45 @@ def load_table():
     return False
 
 
+def _slot_key(slot: dict) -> tuple:
+    """Hashable (index, status, code, name) description of a table slot"""
+    if slot["status"] == "empty":
+        return (slot["index"], "empty", None, None)
+    if slot["status"] == "deleted":
+        return (slot["index"], "deleted", slot["product"], None)
+    product = slot["product"]
+    return (slot["index"], "occupied", product.ma_san_pham, product.ten_san_pham)
+
+
+@st.cache_data(max_entries=32)
+def _build_table_html(version: int, slots: tuple, cols_per_row: int = 5) -> str:
+    """Render the whole hash table as one CSS grid (cached per table state)"""
+    html = []
+    for index, status, code, name in slots:
+        if status == "empty":
+            html.append(f"<div class='hash-slot slot-empty'><b>[{index}]</b><br>TRỐNG</div>")
+        elif status == "deleted":
+            html.append(f"<div class='hash-slot slot-deleted'><b>[{index}]</b><br>ĐÃ XÓA<br><small>{code}</small></div>")
+        else:
+            html.append(f"<div class='hash-slot slot-occupied'><b>[{index}]</b><br>{code}<br><small>{name}</small></div>")
+    return (
+        f"<div class='hash-grid' style='grid-template-columns: repeat({cols_per_row}, 1fr);'>"
+        + "".join(html)
+        + "</div>"
+    )
+
+
+@st.cache_data(max_entries=32)
+def _build_products_df(version: int, rows: tuple) -> pd.DataFrame:
+    """Build the product list DataFrame (cached per table state)"""
+    df = pd.DataFrame.from_records(
+        rows,
+        columns=["Vị trí", "Mã SP", "Tên sản phẩm", "Giá", "Số lượng", "Mô tả"]
+    )
+    df["Giá"] = df["Giá"].map("{:,.0f}đ".format)
+    return df
+
+
 def visualize_hash_table():
     """Visualize hash table with color coding"""
     if st.session_state.hash_table is None:
@@ -79,32 +125,11 @@ def visualize_hash_table():
     
     st.subheader("📊 Trực quan Hash Table")
     
-    table_state = st.session_state.hash_table.get_table_state()
+    hash_table = st.session_state.hash_table
+    slots = tuple(_slot_key(slot) for slot in hash_table.get_table_state())
     
-    # Create columns for grid layout
-    cols_per_row = 5
-    for i in range(0, len(table_state), cols_per_row):
-        cols = st.columns(cols_per_row)
-        for j, col in enumerate(cols):
-            if i + j < len(table_state):
-                slot = table_state[i + j]
-                with col:
-                    if slot["status"] == "empty":
-                        st.markdown(
-                            f"<div class='hash-slot slot-empty'><b>[{slot['index']}]</b><br>TRỐNG</div>",
-                            unsafe_allow_html=True
-                        )
-                    elif slot["status"] == "deleted":
-                        st.markdown(
-                            f"<div class='hash-slot slot-deleted'><b>[{slot['index']}]</b><br>ĐÃ XÓA<br><small>{slot['product']}</small></div>",
-                            unsafe_allow_html=True
-                        )
-                    else:
-                        product = slot["product"]
-                        st.markdown(
-                            f"<div class='hash-slot slot-occupied'><b>[{slot['index']}]</b><br>{product.ma_san_pham}<br><small>{product.ten_san_pham}</small></div>",
-                            unsafe_allow_html=True
-                        )
+    # Render the grid in a single markdown element
+    st.markdown(_build_table_html(hash_table._version, slots), unsafe_allow_html=True)
 
 
 def show_statistics():
@@ -126,6 +151,19 @@ def show_statistics():
         st.metric("Số va chạm", stats["collisions"])
 
 
+def _format_probe(step, h1: int, h2: int, size: int) -> str:
+    """Format the double hashing formula of one probe step for display"""
+    attempt, position = step[0], step[1]
+    return f"({h1} + {attempt} × {h2}) mod {size} = ({h1} + {attempt * h2}) mod {size} = {position}"
+
+
+def record_operation(op: dict):
+    """Append an operation to the database log"""
+    hash_table = st.session_state.hash_table
+    op["detailed"] = hash_table.detailed_logging
+    st.session_state.db_manager.append_op(op, hash_table)
+
+
 def show_probe_sequence(probe_seq: list, message: str):
     """Display probe sequence"""
     if probe_seq:
@@ -159,9 +197,14 @@ def main():
             step=1,
             help="Nên chọn số nguyên tố để giảm va chạm"
         )
+        legacy_hash = st.checkbox(
+            "🔢 Hàm băm tổng ASCII (minh họa)",
+            value=True,
+            help="Bỏ chọn để dùng CRC32: nhanh hơn và phân bố đều hơn, nhưng không hiển thị từng bước tính tổng ASCII"
+        )
         
         if st.button("🆕 Tạo mới", use_container_width=True):
-            create_new_table(table_size)
+            create_new_table(table_size, legacy_hash)
             st.rerun()
         
         # Prime number suggestions
@@ -169,6 +212,17 @@ def main():
         
         st.divider()
         
+        # Detailed collision logging
+        detailed_logging = st.checkbox(
+            "📝 Ghi chi tiết tính toán va chạm",
+            value=True,
+            help="Tắt để thao tác nhanh hơn khi thêm nhiều sản phẩm"
+        )
+        if st.session_state.hash_table is not None:
+            st.session_state.hash_table.detailed_logging = detailed_logging
+        
+        st.divider()
+        
         # Reset database
         if st.button("🗑️ Xóa Database", use_container_width=True, type="secondary"):
             if st.session_state.db_manager.delete():
@@ -220,7 +274,7 @@ def main():
                 if success:
                     st.success(f"✅ {message}")
                     show_probe_sequence(probe_seq, "Quá trình tìm vị trí")
-                    st.session_state.db_manager.save(st.session_state.hash_table)
+                    record_operation({"op": "insert", "pos": probe_seq[-1], "product": product.to_dict()})
                     st.rerun()
                 else:
                     st.error(f"❌ {message}")
@@ -237,8 +291,13 @@ def main():
             if not search_key:
                 st.warning("⚠️ Vui lòng nhập mã sản phẩm")
             else:
+                events_before = st.session_state.hash_table.collision_event_count
                 product, pos, probe_seq = st.session_state.hash_table.search(search_key)
                 
+                # Persist searches that added a collision event to the history
+                if st.session_state.hash_table.collision_event_count != events_before:
+                    record_operation({"op": "search", "pos": pos, "key": search_key})
+                
                 if product:
                     st.success(f"✅ Tìm thấy tại vị trí {pos}")
                     show_probe_sequence(probe_seq, "Quá trình tìm kiếm")
@@ -272,7 +331,7 @@ def main():
                 if success:
                     st.success(f"✅ {message}")
                     show_probe_sequence(probe_seq, "Quá trình tìm kiếm để xóa")
-                    st.session_state.db_manager.save(st.session_state.hash_table)
+                    record_operation({"op": "delete", "pos": probe_seq[-1], "key": delete_key})
                     st.rerun()
                 else:
                     st.error(f"❌ {message}")
@@ -285,19 +344,19 @@ def main():
         products = st.session_state.hash_table.get_all_products()
         
         if products:
-            # Create DataFrame for display
-            data = []
-            for pos, product in products:
-                data.append({
-                    "Vị trí": pos,
-                    "Mã SP": product.ma_san_pham,
-                    "Tên sản phẩm": product.ten_san_pham,
-                    "Giá": f"{product.gia:,.0f}đ",
-                    "Số lượng": product.so_luong,
-                    "Mô tả": product.mo_ta
-                })
+            # Paginate so only the visible page is turned into a DataFrame
+            page_count = (len(products) + PRODUCTS_PER_PAGE - 1) // PRODUCTS_PER_PAGE
+            page = 1
+            if page_count > 1:
+                page = st.number_input("Trang", min_value=1, max_value=page_count, value=1, step=1, key="list_page")
+            page_products = products[(page - 1) * PRODUCTS_PER_PAGE:page * PRODUCTS_PER_PAGE]
             
-            df = pd.DataFrame(data)
+            # Create DataFrame for display
+            rows = tuple(
+                (pos, p.ma_san_pham, p.ten_san_pham, p.gia, p.so_luong, p.mo_ta)
+                for pos, p in page_products
+            )
+            df = _build_products_df(st.session_state.hash_table._version, rows)
             st.dataframe(df, use_container_width=True, hide_index=True)
             
             st.caption(f"📊 Tổng số: {len(products)} sản phẩm")
@@ -312,7 +371,8 @@ def main():
     st.divider()
     st.subheader("📋 Chi tiết Va chạm & Cách xử lý")
     
-    collision_logs = st.session_state.hash_table.get_collision_logs()
+    total_events = st.session_state.hash_table.get_statistics()["total_collision_events"]
+    collision_logs = st.session_state.hash_table.get_collision_logs(limit=COLLISION_LOGS_SHOWN)
     
     if collision_logs:
         st.markdown("""
@@ -324,8 +384,8 @@ def main():
         """)
         
         # Create expander for each collision event
-        for idx, log in enumerate(reversed(collision_logs[-10:])):  # Show last 10
-            event_num = len(collision_logs) - idx
+        for idx, log in enumerate(reversed(collision_logs)):  # Most recent first
+            event_num = total_events - idx
             calc = log.get('calculation_details', {})
             
             with st.expander(f"🔴 Event #{event_num}: {log['operation']} - Key: {log['key']} ({log['collision_count']} va chạm)", expanded=(idx==0)):
@@ -335,20 +395,24 @@ def main():
                     st.markdown("### 🔢 Bước 1: Tính tổng ASCII")
                     ascii_parts = ' + '.join([f"{c}({val})" for c, val in calc['ascii_breakdown']])
                     st.code(f"{ascii_parts} = {calc['ascii_sum']}", language="")
+                elif calc.get('hash_value') is not None:
+                    st.markdown("### 🔢 Bước 1: Tính giá trị băm của key")
+                    st.code(f"{calc['hash_name']} = {calc['hash_value']}", language="")
                 
                 # Hash functions
                 if calc.get('h1_formula'):
+                    hash_name = calc.get('hash_name', 'sum(ASCII)')
                     st.markdown("### 🎯 Bước 2: Tính Hash Functions")
                     col1, col2 = st.columns(2)
                     
                     with col1:
                         st.markdown("**Hash Function 1 (h1):**")
-                        st.code(f"h1 = sum(ASCII) mod size\nh1 = {calc['h1_formula']}", language="python")
+                        st.code(f"h1 = {hash_name} mod size\nh1 = {calc['h1_formula']}", language="python")
                         st.success(f"**h1 = {calc['h1']}** (vị trí ban đầu)")
                     
                     with col2:
                         st.markdown("**Hash Function 2 (h2):**")
-                        st.code(f"R = {calc['R']} (số nguyên tố < {calc['size']})\nh2 = R - (sum mod R)\nh2 = {calc['h2_formula']}", language="python")
+                        st.code(f"R = {calc['R']} (số nguyên tố < {calc['size']})\nh2 = R - ({hash_name} mod R)\nh2 = {calc['h2_formula']}", language="python")
                         st.success(f"**h2 = {calc['h2']}** (bước nhảy)")
                 
                 # Probe sequence details
@@ -356,39 +420,39 @@ def main():
                     st.markdown("### 🔍 Bước 3: Thăm dò (Probing)")
                     
                     for step in calc['probe_steps']:
-                        attempt = step['attempt']
+                        attempt, position, status, occupied_by = step
                         
                         # Color based on status
-                        if step['status'] == 'empty':
+                        if status == SLOT_EMPTY:
                             status_icon = "✅"
                             status_color = "green"
                             status_text = "TRỐNG - Tìm được!"
-                        elif step['status'] == 'deleted':
+                        elif status == SLOT_DELETED:
                             status_icon = "⚠️"
                             status_color = "orange"
                             status_text = "ĐÃ XÓA - Có thể dùng"
                         else:  # occupied
                             status_icon = "🔴"
                             status_color = "red"
-                            occupied_by = step.get('occupied_by', step.get('found_key', '?'))
-                            status_text = f"ĐÃ CHIẾM bởi {occupied_by}"
+                            status_text = f"ĐÃ CHIẾM bởi {occupied_by or '?'}"
                         
                         with st.container():
                             col_a, col_b = st.columns([3, 2])
                             
                             with col_a:
-                                st.markdown(f"**Lần thử {attempt}:** `{step['formula']}`")
+                                formula = _format_probe(step, calc['h1'], calc['h2'], calc['size'])
+                                st.markdown(f"**Lần thử {attempt}:** `{formula}`")
                             
                             with col_b:
-                                if step['status'] == 'occupied':
-                                    st.error(f"{status_icon} Slot [{step['position']}]: {status_text}")
-                                elif step['status'] == 'empty':
-                                    st.success(f"{status_icon} Slot [{step['position']}]: {status_text}")
+                                if status == SLOT_EMPTY:
+                                    st.success(f"{status_icon} Slot [{position}]: {status_text}")
+                                elif status == SLOT_DELETED:
+                                    st.warning(f"{status_icon} Slot [{position}]: {status_text}")
                                 else:
-                                    st.warning(f"{status_icon} Slot [{step['position']}]: {status_text}")
+                                    st.error(f"{status_icon} Slot [{position}]: {status_text}")
                         
                         # Stop after finding empty/deleted slot for insert
-                        if log['operation'] == 'INSERT' and step['status'] in ['empty', 'deleted']:
+                        if log['operation'] == 'INSERT' and status in (SLOT_EMPTY, SLOT_DELETED):
                             break
                 
                 # Summary
@@ -403,8 +467,8 @@ def main():
                 
                 st.info(f"🎯 **Kết quả**: {log['resolution']}")
         
-        if len(collision_logs) > 10:
-            st.caption(f"Hiển thị 10 sự kiện gần nhất. Tổng cộng: {len(collision_logs)} sự kiện va chạm")
+        if total_events > COLLISION_LOGS_SHOWN:
+            st.caption(f"Hiển thị {COLLISION_LOGS_SHOWN} sự kiện gần nhất. Tổng cộng: {total_events} sự kiện va chạm")
     else:
         st.info("✨ Chưa có va chạm nào xảy ra. Thử thêm nhiều sản phẩm hơn!")
 
@@ -1,10 +1,36 @@
 """
 Database manager for saving/loading hash table to/from JSON
+
+Persistence is a full JSON snapshot plus an append-only JSON-lines
+operation log next to it; the log is folded back into the snapshot
+(compaction) once it grows past twice the number of live entries.
 """
 import json
 import os
-from typing import Optional
+import threading
+from typing import Optional, Tuple
 from double_hashing import DoubleHashTable
+from models import Product
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+
+def _dumps(data, indent: bool = False) -> bytes:
+    """Serialize data to UTF-8 JSON bytes, using orjson when available"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _loads(content: bytes):
+    """Deserialize UTF-8 JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
 
 
 class DatabaseManager:
@@ -18,10 +44,25 @@ class DatabaseManager:
             filepath: Path to JSON database file
         """
         self.filepath = filepath
+        self.log_filepath = os.path.splitext(filepath)[0] + ".jsonl"
+        # Operations are numbered from 0 in append order; the log file holds
+        # operations [_log_start, _log_end)
+        self._log_start = 0
+        self._log_end = 0
+        # Snapshots are numbered when taken; older ones are never written
+        # over a newer one, even if their background write finishes last
+        self._generation = 0
+        self._written_generation = 0
+        self._last_hash: Optional[int] = None  # Hash of the last content written
+        self._lock = threading.Lock()
     
     def save(self, hash_table: DoubleHashTable) -> bool:
         """
-        Save hash table to JSON file
+        Save a full snapshot of the hash table to JSON file
+        
+        The write is skipped when the serialized content is unchanged
+        since the last save. The operation log is cleared either way,
+        since the snapshot already contains its effects.
         
         Args:
             hash_table: DoubleHashTable instance to save
@@ -30,17 +71,111 @@ class DatabaseManager:
             True if successful, False otherwise
         """
         try:
-            data = hash_table.to_dict()
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return True
+            return self._write(*self._snapshot(hash_table))
+        except Exception as e:
+            print(f"Error saving to database: {e}")
+            return False
+    
+    def save_async(self, hash_table: DoubleHashTable) -> threading.Thread:
+        """
+        Save hash table to JSON file in a background thread
+        
+        The table is snapshotted on the calling thread; only the JSON
+        encoding and file write happen out-of-band.
+        
+        Args:
+            hash_table: DoubleHashTable instance to save
+            
+        Returns:
+            The started writer thread (join it to wait for completion)
+        """
+        thread = threading.Thread(target=self._write_safe, args=self._snapshot(hash_table), daemon=True)
+        thread.start()
+        return thread
+    
+    def _snapshot(self, hash_table: DoubleHashTable) -> Tuple[dict, int, int]:
+        """
+        Capture the table together with its generation and log position
+        
+        Returns:
+            Tuple of (snapshot dictionary, generation, log position covered)
+        """
+        with self._lock:
+            self._generation += 1
+            return hash_table.to_dict(), self._generation, self._log_end
+    
+    def _write(self, data: dict, generation: int, covered_ops: int) -> bool:
+        """
+        Write serialized data unless it matches the last write
+        
+        A snapshot older than the last one written is dropped, so an
+        out-of-order background write cannot replace newer data.
+        
+        Args:
+            data: Snapshot dictionary
+            generation: Generation number of the snapshot
+            covered_ops: Log position up to which operations are reflected in data
+        """
+        content = _dumps(data, indent=True)
+        content_hash = hash(content)
+        with self._lock:
+            if generation <= self._written_generation:
+                return True
+            self._written_generation = generation
+            if content_hash != self._last_hash or not self.exists():
+                with open(self.filepath, 'wb') as f:
+                    f.write(content)
+                self._last_hash = content_hash
+            self._truncate_log(covered_ops)
+        return True
+    
+    def _write_safe(self, data: dict, generation: int, covered_ops: int) -> bool:
+        """Background-thread variant of _write that reports errors"""
+        try:
+            return self._write(data, generation, covered_ops)
         except Exception as e:
             print(f"Error saving to database: {e}")
             return False
     
+    def append_op(self, op: dict, hash_table: Optional[DoubleHashTable] = None) -> bool:
+        """
+        Append one operation to the JSON-lines log
+        
+        Operations have the form {"op": "insert", "pos": p, "product": {...}},
+        {"op": "delete", "pos": p, "key": k} or {"op": "search", "pos": p, "key": k}
+        (searches are only logged when they record a collision event). An
+        optional "detailed" flag stores the table's detailed_logging setting
+        at the time of the operation. When hash_table is given
+        and the log has grown past twice its live entry count, a full
+        snapshot is written instead and the log is cleared.
+        
+        Args:
+            op: Operation dictionary
+            hash_table: Current hash table, used for compaction
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self._lock:
+                with open(self.log_filepath, 'ab') as f:
+                    f.write(_dumps(op) + b"\n")
+                self._log_end += 1
+                needs_compaction = (
+                    hash_table is not None
+                    and self._log_end - self._log_start > 2 * hash_table.count
+                )
+        except Exception as e:
+            print(f"Error appending to database log: {e}")
+            return False
+        
+        if needs_compaction:
+            return self.save(hash_table)
+        return True
+    
     def load(self) -> Optional[DoubleHashTable]:
         """
-        Load hash table from JSON file
+        Load hash table from JSON file and replay the operation log
         
         Returns:
             DoubleHashTable instance if file exists, None otherwise
@@ -49,22 +184,118 @@ class DatabaseManager:
             return None
         
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return DoubleHashTable.from_dict(data)
+            with open(self.filepath, 'rb') as f:
+                data = _loads(f.read())
+            hash_table = DoubleHashTable.from_dict(data)
+            replayed = self._replay_log(hash_table)
+            with self._lock:
+                self._log_start = self._log_end
+                self._log_end += replayed
+            return hash_table
         except Exception as e:
             print(f"Error loading from database: {e}")
             return None
     
+    def _replay_log(self, hash_table: DoubleHashTable) -> int:
+        """
+        Re-apply logged operations on top of a loaded snapshot
+        
+        Operations are re-executed through insert/delete/search so that the
+        collision statistics and logs are rebuilt as well; the resulting
+        position is checked against the logged one.
+        
+        Returns:
+            Number of operations replayed
+        """
+        if not os.path.exists(self.log_filepath):
+            return 0
+        
+        with open(self.log_filepath, 'rb') as f:
+            lines = [line for line in f if line.strip()]
+        
+        replayed = 0
+        for i, line in enumerate(lines):
+            try:
+                op = _loads(line)
+            except ValueError:
+                if i < len(lines) - 1:
+                    raise
+                # A crash mid-append leaves a torn last line: drop it and
+                # keep everything replayed before it
+                print(f"Ignoring incomplete last entry in {self.log_filepath}")
+                with open(self.log_filepath, 'wb') as f:
+                    f.writelines(lines[:i])
+                break
+            
+            detailed_logging = hash_table.detailed_logging
+            hash_table.detailed_logging = op.get("detailed", True)
+            try:
+                pos = self._apply_op(hash_table, op)
+            finally:
+                hash_table.detailed_logging = detailed_logging
+            if pos != op.get("pos", pos):
+                print(f"Replayed {op['op']} ended at position {pos}, "
+                      f"log recorded {op['pos']} ({self.log_filepath} line {i + 1})")
+            replayed += 1
+        return replayed
+    
+    def _apply_op(self, hash_table: DoubleHashTable, op: dict) -> int:
+        """
+        Re-execute one logged operation
+        
+        Returns:
+            Position the operation ended at (-1 if it failed)
+        """
+        if op["op"] == "insert":
+            success, _, probe_sequence = hash_table.insert(Product.from_dict(op["product"]))
+        elif op["op"] == "delete":
+            success, _, probe_sequence = hash_table.delete(op["key"])
+        elif op["op"] == "search":
+            return hash_table.search(op["key"])[1]
+        else:
+            raise ValueError(f"Unknown operation: {op['op']}")
+        return probe_sequence[-1] if success else -1
+    
+    def _truncate_log(self, covered_ops: Optional[int] = None):
+        """
+        Drop logged operations already contained in a snapshot
+        
+        Caller must hold the lock.
+        
+        Args:
+            covered_ops: Log position reflected in the snapshot (None drops all)
+        """
+        if covered_ops is None or covered_ops >= self._log_end:
+            if os.path.exists(self.log_filepath):
+                os.remove(self.log_filepath)
+            self._log_start = self._log_end
+            return
+        
+        drop = covered_ops - self._log_start
+        if drop <= 0:
+            return
+        
+        # Operations were appended while the snapshot was being written
+        with open(self.log_filepath, 'rb') as f:
+            remaining = [line for line in f if line.strip()][drop:]
+        with open(self.log_filepath, 'wb') as f:
+            f.writelines(remaining)
+        self._log_start = covered_ops
+    
     def exists(self) -> bool:
         """Check if database file exists"""
         return os.path.exists(self.filepath)
     
     def delete(self) -> bool:
-        """Delete database file"""
+        """Delete database file and its operation log"""
         try:
-            if self.exists():
-                os.remove(self.filepath)
+            with self._lock:
+                if self.exists():
+                    os.remove(self.filepath)
+                self._truncate_log()
+                self._last_hash = None
+                # Pending background writes must not recreate the file
+                self._written_generation = self._generation
             return True
         except Exception as e:
             print(f"Error deleting database: {e}")
@@ -1,13 +1,160 @@
 """
 Double Hashing implementation for Product Management
 """
-from typing import Optional, List, Tuple, Dict
+import zlib
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Optional, List, Tuple, Dict, Deque, Sequence
 from models import Product, HashEntry
 
+# Keep only the most recent collision events (the UI shows the last 10)
+MAX_COLLISION_LOGS = 200
+
+# Slot status codes used in collision log probe steps
+SLOT_EMPTY = 0
+SLOT_OCCUPIED = 1
+SLOT_DELETED = 2
+_SLOT_STATUS_CODES = {"empty": SLOT_EMPTY, "occupied": SLOT_OCCUPIED, "deleted": SLOT_DELETED}
+
+
+@lru_cache(maxsize=None)
+def _largest_prime_below(n: int) -> int:
+    """
+    Find largest prime number less than n using a Sieve of Eratosthenes
+    
+    Args:
+        n: Upper bound
+        
+    Returns:
+        Largest prime < n (1 if there is none)
+    """
+    if n <= 2:
+        return 1
+    sieve = bytearray([1]) * n
+    sieve[0] = sieve[1] = 0
+    for i in range(2, int((n - 1) ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, n, i)))
+    for i in range(n - 1, 1, -1):
+        if sieve[i]:
+            return i
+    return 1
+
+
+def _ascii_sum(key: str) -> int:
+    """
+    Sum of character codes of a key
+    
+    Args:
+        key: Product code string
+        
+    Returns:
+        sum(ord(c) for c in key)
+    """
+    try:
+        # Pure-ASCII keys: bytes are the code points, summed in C
+        return sum(key.encode('ascii'))
+    except UnicodeEncodeError:
+        # UTF-8 bytes would give a different sum, keep hashes stable
+        return sum(map(ord, key))
+
+
+def _probe_find(keys: List[Optional[str]], deleted: bytearray, key: str,
+                h1: int, h2: int, size: int, stop_at_deleted: bool) -> Tuple[int, List[int]]:
+    """
+    Walk the double hashing probe sequence over the slot arrays
+    
+    Positions advance by h2 with a single wrap-around subtraction instead
+    of recomputing (h1 + i * h2) mod size on every attempt.
+    
+    Args:
+        keys: Product code per slot (None for empty)
+        deleted: Deleted flag per slot
+        key: Product code being looked up
+        h1: hash1(key)
+        h2: hash2(key), 1 <= h2 < size
+        size: Table size
+        stop_at_deleted: Stop at deleted slots too (insert) instead of skipping them (search)
+        
+    Returns:
+        Tuple of (position or -1 if the sequence is exhausted, probe sequence)
+    """
+    probe_sequence = []
+    pos = h1
+    for _ in range(size):
+        probe_sequence.append(pos)
+        slot_key = keys[pos]
+        if slot_key is None:
+            return pos, probe_sequence
+        if deleted[pos]:
+            if stop_at_deleted:
+                return pos, probe_sequence
+        elif slot_key == key:
+            return pos, probe_sequence
+        pos += h2
+        if pos >= size:
+            pos -= size
+    return -1, probe_sequence
+
+
+def _key_hash(key: str, legacy: bool) -> int:
+    """
+    Integer hash of a key before it is reduced modulo the table size
+    
+    Args:
+        key: Product code string
+        legacy: Use the educational ASCII sum instead of CRC32
+        
+    Returns:
+        Non-negative hash value
+    """
+    if legacy:
+        return _ascii_sum(key)
+    # Python's built-in hash() is salted per process, which would move
+    # keys between runs of a saved table; CRC32 is fast and deterministic
+    return zlib.crc32(key.encode('utf-8'))
+
+
+@lru_cache(maxsize=4096)
+def _hash1_cached(key: str, size: int, legacy: bool) -> int:
+    """hash1 for a key and table size, memoized across operations"""
+    return _key_hash(key, legacy) % size
+
+
+@lru_cache(maxsize=4096)
+def _hash2_cached(key: str, R: int, legacy: bool) -> int:
+    """hash2 for a key and prime R, memoized across operations"""
+    return R - (_key_hash(key, legacy) % R)
+
+
+def _normalize_probe_steps(calculation_details: Dict) -> Dict:
+    """
+    Convert probe steps saved in the older dict format to step tuples
+    
+    Args:
+        calculation_details: Calculation details loaded from JSON
+        
+    Returns:
+        The same details with probe_steps as (attempt, position, status, occupant)
+    """
+    steps = calculation_details.get("probe_steps")
+    if steps and isinstance(steps[0], dict):
+        calculation_details["probe_steps"] = [
+            (
+                step["attempt"],
+                step["position"],
+                _SLOT_STATUS_CODES[step["status"]],
+                step.get("occupied_by", step.get("found_key"))
+            )
+            for step in steps
+        ]
+    return calculation_details
+
 
 class CollisionLog:
     """Log entry for collision events"""
-    def __init__(self, key: str, operation: str, probe_sequence: List[int], resolution: str, 
+    def __init__(self, key: str, operation: str, probe_sequence: Sequence[int], resolution: str, 
                  calculation_details: Dict = None):
         self.key = key
         self.operation = operation  # 'insert', 'search', 'delete'
@@ -20,22 +167,38 @@ class CollisionLog:
 class DoubleHashTable:
     """Hash table with Double Hashing collision resolution"""
     
-    def __init__(self, size: int = 10):
+    def __init__(self, size: int = 10, legacy_hash: bool = False):
         """
         Initialize hash table with given size
         
         Args:
             size: Size of hash table (should be prime number for better distribution)
+            legacy_hash: Hash keys by the sum of their ASCII values (shown step by
+                step in the UI) instead of CRC32
         """
         self.size = size
-        self.table: List[Optional[HashEntry]] = [None] * size
+        self.legacy_hash = legacy_hash
+        # Slots are stored as parallel arrays (structure of arrays):
+        # empty -> product None; deleted -> product kept and deleted flag set
+        self._keys: List[Optional[str]] = [None] * size  # Product code per slot
+        self._products: List[Optional[Product]] = [None] * size
+        self._deleted = bytearray(size)  # 1 if the slot was lazily deleted
+        self._occupied = bytearray(size)  # 1 if the slot holds an active product
         self.count = 0  # Number of active elements
         self.collision_count = 0  # Track collisions for statistics
-        self.collision_logs: List[CollisionLog] = []  # Detailed collision history
+        self.collision_logs: Deque[CollisionLog] = deque(maxlen=MAX_COLLISION_LOGS)  # Recent collision history
+        self.collision_event_count = 0  # All collision events ever logged (not capped)
+        self._R = _largest_prime_below(size)  # Prime used by hash2, depends only on size
+        self.detailed_logging: bool = True  # Attach step-by-step math to collision logs
+        self._deleted_count = 0  # Number of lazily deleted slots
+        self._index: Dict[str, int] = {}  # Product code -> position of active entry
+        self._version = 0  # Bumped on every table mutation
+        self._view_cache: Dict[str, Tuple[int, object]] = {}  # name -> (version, view)
         
     def _hash1(self, key: str) -> int:
         """
-        Primary hash function: sum of ASCII values mod table size
+        Primary hash function: key hash mod table size
+        (key hash is sum of ASCII values with legacy_hash, else CRC32)
         
         Args:
             key: Product code string
@@ -43,13 +206,12 @@ class DoubleHashTable:
         Returns:
             Hash value (0 to size-1)
         """
-        hash_value = sum(ord(char) for char in key)
-        return hash_value % self.size
+        return _hash1_cached(key, self.size, self.legacy_hash)
     
     def _hash2(self, key: str) -> int:
         """
         Secondary hash function for double hashing
-        Uses formula: R - (sum(ASCII) mod R) where R is largest prime < size
+        Uses formula: R - (hash(key) mod R) where R is largest prime < size
         
         Args:
             key: Product code string
@@ -57,46 +219,63 @@ class DoubleHashTable:
         Returns:
             Step size for probing (1 to R)
         """
-        R = self._get_prime_less_than(self.size)
-        hash_value = sum(ord(char) for char in key)
-        return R - (hash_value % R)
+        return _hash2_cached(key, self._R, self.legacy_hash)
     
-    def _get_prime_less_than(self, n: int) -> int:
+    def _build_calculation_details(self, key: str, h1: int, h2: int,
+                                   probe_sequence: List[int]) -> Dict:
         """
-        Find largest prime number less than n
+        Reconstruct detailed math steps for a collision log
         
-        Args:
-            n: Upper bound
-            
-        Returns:
-            Largest prime < n
-        """
-        def is_prime(num):
-            if num < 2:
-                return False
-            for i in range(2, int(num ** 0.5) + 1):
-                if num % i == 0:
-                    return False
-            return True
-        
-        for i in range(n - 1, 1, -1):
-            if is_prime(i):
-                return i
-        return 1
-    
-    def _probe(self, key: str, i: int) -> int:
-        """
-        Calculate probe position using double hashing
-        Formula: (hash1(key) + i * hash2(key)) mod size
+        Only called when a collision is about to be logged, so the common
+        no-collision path never pays for the formatting. Probe steps are
+        stored as raw (attempt, position, status, occupant) tuples; the
+        probe formula text is produced by the UI when it is displayed.
         
         Args:
             key: Product code
-            i: Probe attempt number (0, 1, 2, ...)
+            h1: hash1(key)
+            h2: hash2(key)
+            probe_sequence: Positions probed so far
             
         Returns:
-            Position in table
+            Calculation details dictionary (empty if detailed logging is off)
         """
-        return (self._hash1(key) + i * self._hash2(key)) % self.size
+        if not self.detailed_logging:
+            return {}
+        
+        R = self._R
+        hash_value = _key_hash(key, self.legacy_hash)
+        probe_steps = []
+        for i, pos in enumerate(probe_sequence):
+            slot_key = self._keys[pos]
+            if slot_key is None:
+                probe_steps.append((i, pos, SLOT_EMPTY, None))
+            elif self._deleted[pos]:
+                probe_steps.append((i, pos, SLOT_DELETED, None))
+            else:
+                probe_steps.append((i, pos, SLOT_OCCUPIED, slot_key))
+        
+        details = {
+            "key": key,
+            "hash_name": "sum(ASCII)" if self.legacy_hash else "crc32(key)",
+            "hash_value": hash_value,
+            "size": self.size,
+            "R": R,
+            "h1": h1,
+            "h1_formula": f"{hash_value} mod {self.size} = {h1}",
+            "h2": h2,
+            "h2_formula": f"{R} - ({hash_value} mod {R}) = {R} - {hash_value % R} = {h2}",
+            "probe_steps": probe_steps
+        }
+        if self.legacy_hash:
+            details["ascii_sum"] = hash_value
+            details["ascii_breakdown"] = [(c, ord(c)) for c in key]
+        return details
+    
+    def _log_collision(self, log: CollisionLog):
+        """Record a collision event, keeping the running total accurate"""
+        self.collision_logs.append(log)
+        self.collision_event_count += 1
     
     def insert(self, product: Product) -> Tuple[bool, str, List[int]]:
         """
@@ -112,126 +291,94 @@ class DoubleHashTable:
             return False, "Hash table is full!", []
         
         key = product.ma_san_pham
-        probe_sequence = []
         
-        # Calculate detailed math for logging
-        ascii_sum = sum(ord(char) for char in key)
         h1_value = self._hash1(key)
         h2_value = self._hash2(key)
-        R = self._get_prime_less_than(self.size)
         
-        calculation_details = {
-            "key": key,
-            "ascii_sum": ascii_sum,
-            "ascii_breakdown": [(c, ord(c)) for c in key],
-            "size": self.size,
-            "R": R,
-            "h1": h1_value,
-            "h1_formula": f"{ascii_sum} mod {self.size} = {h1_value}",
-            "h2": h2_value,
-            "h2_formula": f"{R} - ({ascii_sum} mod {R}) = {R} - {ascii_sum % R} = {h2_value}",
-            "probe_steps": []
-        }
+        pos, probe_sequence = _probe_find(self._keys, self._deleted, key, h1_value, h2_value, self.size, True)
+        attempts = len(probe_sequence)
         
-        for i in range(self.size):
-            pos = self._probe(key, i)
-            probe_sequence.append(pos)
-            
-            # Log detailed probe step
-            probe_formula = f"({h1_value} + {i} × {h2_value}) mod {self.size} = ({h1_value} + {i * h2_value}) mod {self.size} = {pos}"
-            step_info = {
-                "attempt": i,
-                "formula": probe_formula,
-                "position": pos,
-                "status": "occupied" if self.table[pos] and not self.table[pos].is_deleted else ("deleted" if self.table[pos] else "empty")
-            }
-            if self.table[pos] and not self.table[pos].is_deleted:
-                step_info["occupied_by"] = self.table[pos].product.ma_san_pham
-            calculation_details["probe_steps"].append(step_info)
-            
-            # Empty slot or deleted slot
-            if self.table[pos] is None or self.table[pos].is_deleted:
-                self.table[pos] = HashEntry(product, False)
-                self.count += 1
-                
-                # Log collision if occurred
-                if i > 0:
-                    self.collision_count += 1
-                    resolution = f"Giải quyết bằng Double Hashing sau {i} lần thăm dò. Vị trí cuối: {pos}"
-                    self.collision_logs.append(CollisionLog(key, "INSERT", probe_sequence.copy(), resolution, calculation_details))
-                
-                return True, f"Inserted at position {pos}", probe_sequence
-            
-            # Key already exists
-            if self.table[pos].product.ma_san_pham == key:
-                return False, "Product code already exists!", probe_sequence
-            
-            # Collision occurred
-            if i == 0:
-                self.collision_count += 1
+        # Collision occurred on the first probe
+        if attempts > 1 or pos < 0:
+            self.collision_count += 1
+        
+        if pos < 0:
+            return False, "Could not insert (table full)", probe_sequence
+        
+        slot_key = self._keys[pos]
         
-        return False, "Could not insert (table full)", probe_sequence
+        # Key already exists (a deleted slot may also come before it in the chain)
+        if (slot_key == key and not self._deleted[pos]) or key in self._index:
+            return False, "Product code already exists!", probe_sequence
+        
+        # Log collision if occurred (details need the slot states before placing)
+        i = attempts - 1
+        if i > 0:
+            self.collision_count += 1
+            resolution = f"Giải quyết bằng Double Hashing sau {i} lần thăm dò. Vị trí cuối: {pos}"
+            calculation_details = self._build_calculation_details(
+                key, h1_value, h2_value, probe_sequence
+            )
+            self._log_collision(CollisionLog(key, "INSERT", tuple(probe_sequence), resolution, calculation_details))
+        
+        if slot_key is not None:
+            self._deleted[pos] = 0
+            self._deleted_count -= 1
+        self._keys[pos] = key
+        self._products[pos] = product
+        self._occupied[pos] = 1
+        self._index[key] = pos
+        self.count += 1
+        self._version += 1
+        
+        return True, f"Inserted at position {pos}", probe_sequence
     
     def search(self, key: str) -> Tuple[Optional[Product], int, List[int]]:
         """
         Search for product by key
         
+        With detailed logging off the position comes straight from the
+        key index; otherwise the probe sequence is walked so it can be
+        shown and logged.
+        
         Args:
             key: Product code
             
         Returns:
             Tuple of (product or None, position, probe_sequence)
         """
-        probe_sequence = []
+        if not self.detailed_logging:
+            pos = self._index.get(key)
+            if pos is None:
+                return None, -1, []
+            return self._products[pos], pos, [pos]
         
-        # Calculate detailed math for logging
-        ascii_sum = sum(ord(char) for char in key)
         h1_value = self._hash1(key)
         h2_value = self._hash2(key)
-        R = self._get_prime_less_than(self.size)
         
-        calculation_details = {
-            "key": key,
-            "ascii_sum": ascii_sum,
-            "ascii_breakdown": [(c, ord(c)) for c in key],
-            "size": self.size,
-            "R": R,
-            "h1": h1_value,
-            "h1_formula": f"{ascii_sum} mod {self.size} = {h1_value}",
-            "h2": h2_value,
-            "h2_formula": f"{R} - ({ascii_sum} mod {R}) = {R} - {ascii_sum % R} = {h2_value}",
-            "probe_steps": []
-        }
+        pos, probe_sequence = _probe_find(self._keys, self._deleted, key, h1_value, h2_value, self.size, False)
+        attempts = len(probe_sequence)
         
-        for i in range(self.size):
-            pos = self._probe(key, i)
-            probe_sequence.append(pos)
-            
-            # Log detailed probe step
-            probe_formula = f"({h1_value} + {i} × {h2_value}) mod {self.size} = ({h1_value} + {i * h2_value}) mod {self.size} = {pos}"
-            step_info = {
-                "attempt": i,
-                "formula": probe_formula,
-                "position": pos,
-                "status": "empty" if self.table[pos] is None else ("deleted" if self.table[pos].is_deleted else "occupied")
-            }
-            if self.table[pos] and not self.table[pos].is_deleted:
-                step_info["found_key"] = self.table[pos].product.ma_san_pham
-            calculation_details["probe_steps"].append(step_info)
-            
-            if self.table[pos] is None:
-                if i > 0:
-                    resolution = f"Tìm kiếm thất bại sau {i} lần thăm dò. Gặp slot trống tại vị trí {pos}"
-                    self.collision_logs.append(CollisionLog(key, "SEARCH", probe_sequence.copy(), resolution, calculation_details))
-                return None, -1, probe_sequence
-            
-            if not self.table[pos].is_deleted and self.table[pos].product.ma_san_pham == key:
-                if i > 0:
-                    resolution = f"Tìm thấy sau {i} lần thăm dò tại vị trí {pos}"
-                    self.collision_logs.append(CollisionLog(key, "SEARCH", probe_sequence.copy(), resolution, calculation_details))
-                return self.table[pos].product, pos, probe_sequence
+        if pos < 0:
+            return None, -1, probe_sequence
+        
+        i = attempts - 1
+        if self._keys[pos] is None:
+            if i > 0:
+                resolution = f"Tìm kiếm thất bại sau {i} lần thăm dò. Gặp slot trống tại vị trí {pos}"
+                calculation_details = self._build_calculation_details(
+                    key, h1_value, h2_value, probe_sequence
+                )
+                self._log_collision(CollisionLog(key, "SEARCH", tuple(probe_sequence), resolution, calculation_details))
+            return None, -1, probe_sequence
         
-        return None, -1, probe_sequence
+        if i > 0:
+            resolution = f"Tìm thấy sau {i} lần thăm dò tại vị trí {pos}"
+            calculation_details = self._build_calculation_details(
+                key, h1_value, h2_value, probe_sequence
+            )
+            self._log_collision(CollisionLog(key, "SEARCH", tuple(probe_sequence), resolution, calculation_details))
+        return self._products[pos], pos, probe_sequence
     
     def delete(self, key: str) -> Tuple[bool, str, List[int]]:
         """
@@ -248,47 +395,88 @@ class DoubleHashTable:
         if product is None:
             return False, "Product not found!", probe_sequence
         
-        self.table[pos].is_deleted = True
+        self._deleted[pos] = 1
+        self._occupied[pos] = 0
+        del self._index[key]
         self.count -= 1
+        self._deleted_count += 1
+        self._version += 1
         return True, f"Deleted from position {pos}", probe_sequence
     
+    def _cached_view(self, name: str, build):
+        """
+        Return a derived view of the table, rebuilding it only after mutations
+        
+        Args:
+            name: Cache slot name
+            build: Zero-argument function producing the view
+            
+        Returns:
+            The cached or freshly built view (shared, do not mutate)
+        """
+        cached = self._view_cache.get(name)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        view = build()
+        self._view_cache[name] = (self._version, view)
+        return view
+    
     def get_all_products(self) -> List[Tuple[int, Product]]:
         """
         Get all active products with their positions
         
+        The list is cached until the next insert/delete and shared between
+        callers: copy it before modifying.
+        
         Returns:
             List of (position, product) tuples
         """
-        products = []
-        for i, entry in enumerate(self.table):
-            if entry is not None and not entry.is_deleted:
-                products.append((i, entry.product))
-        return products
+        return self._cached_view("products", self._build_all_products)
+    
+    def _build_all_products(self) -> List[Tuple[int, Product]]:
+        """Scan the table for active products"""
+        products = self._products
+        return [(i, products[i]) for i, occupied in enumerate(self._occupied) if occupied]
     
     def get_table_state(self) -> List[dict]:
         """
         Get full table state for visualization
         
+        The list and its slot dictionaries are cached until the next
+        insert/delete and shared between callers: copy them before modifying.
+        
         Returns:
             List of dictionaries representing each slot
         """
+        return self._cached_view("table_state", self._build_table_state)
+    
+    def _build_table_state(self) -> List[dict]:
+        """Describe every slot of the table"""
         state = []
-        for i, entry in enumerate(self.table):
-            if entry is None:
+        for i, (key, product, deleted) in enumerate(zip(self._keys, self._products, self._deleted)):
+            if product is None:
                 state.append({"index": i, "status": "empty", "product": None})
-            elif entry.is_deleted:
-                state.append({"index": i, "status": "deleted", "product": entry.product.ma_san_pham})
+            elif deleted:
+                state.append({"index": i, "status": "deleted", "product": key})
             else:
-                state.append({"index": i, "status": "occupied", "product": entry.product})
+                state.append({"index": i, "status": "occupied", "product": product})
         return state
     
-    def get_collision_logs(self) -> List[Dict]:
+    def get_collision_logs(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
         """
         Get detailed collision logs
         
+        Only the requested window is converted to dictionaries.
+        
+        Args:
+            limit: Maximum number of logs to return (None for all)
+            offset: Number of most recent logs to skip
+            
         Returns:
-            List of collision log dictionaries
+            List of collision log dictionaries, oldest first
         """
+        end = max(len(self.collision_logs) - offset, 0)
+        start = 0 if limit is None else max(end - limit, 0)
         return [
             {
                 "key": log.key,
@@ -298,7 +486,7 @@ class DoubleHashTable:
                 "resolution": log.resolution,
                 "calculation_details": log.calculation_details
             }
-            for log in self.collision_logs
+            for log in islice(self.collision_logs, start, end)
         ]
     
     def get_statistics(self) -> dict:
@@ -308,8 +496,8 @@ class DoubleHashTable:
         Returns:
             Dictionary with statistics
         """
-        occupied = sum(1 for entry in self.table if entry and not entry.is_deleted)
-        deleted = sum(1 for entry in self.table if entry and entry.is_deleted)
+        occupied = self.count
+        deleted = self._deleted_count
         empty = self.size - occupied - deleted
         load_factor = occupied / self.size if self.size > 0 else 0
         
@@ -320,39 +508,58 @@ class DoubleHashTable:
             "empty": empty,
             "load_factor": load_factor,
             "collisions": self.collision_count,
-            "total_collision_events": len(self.collision_logs)
+            "total_collision_events": self.collision_event_count
         }
     
     def to_dict(self) -> dict:
         """Convert hash table to dictionary for JSON serialization"""
         return {
             "size": self.size,
+            "legacy_hash": self.legacy_hash,
             "count": self.count,
             "collision_count": self.collision_count,
+            "collision_event_count": self.collision_event_count,
             "collision_logs": self.get_collision_logs(),
-            "table": [entry.to_dict() if entry else None for entry in self.table]
+            "table": [
+                HashEntry(product, bool(deleted)).to_dict() if product is not None else None
+                for product, deleted in zip(self._products, self._deleted)
+            ]
         }
     
     @classmethod
     def from_dict(cls, data: dict) -> 'DoubleHashTable':
         """Create hash table from dictionary"""
-        ht = cls(data["size"])
+        # Tables saved before the hash option existed used the ASCII sum
+        ht = cls(data["size"], data.get("legacy_hash", True))
         ht.count = data["count"]
         ht.collision_count = data["collision_count"]
-        ht.table = [
-            HashEntry.from_dict(entry) if entry else None 
-            for entry in data["table"]
-        ]
+        for i, entry_data in enumerate(data["table"]):
+            entry = HashEntry.from_dict(entry_data) if entry_data else None
+            if entry is None or entry.product is None:
+                continue
+            ht._keys[i] = entry.product.ma_san_pham
+            ht._products[i] = entry.product
+            if entry.is_deleted:
+                ht._deleted[i] = 1
+                ht._deleted_count += 1
+            else:
+                ht._occupied[i] = 1
+                ht._index[entry.product.ma_san_pham] = i
+        ht._version += 1
         # Restore collision logs if available
         if "collision_logs" in data:
-            ht.collision_logs = [
+            ht.collision_logs = deque((
                 CollisionLog(
                     log["key"],
                     log["operation"],
-                    log["probe_sequence"],
+                    tuple(log["probe_sequence"]),
                     log["resolution"],
-                    log.get("calculation_details", {})
+                    _normalize_probe_steps(log.get("calculation_details", {}))
                 )
                 for log in data["collision_logs"]
-            ]
+            ), maxlen=MAX_COLLISION_LOGS)
+        # Older files kept every event, so their log length is the total
+        ht.collision_event_count = data.get(
+            "collision_event_count", len(data.get("collision_logs", []))
+        )
         return ht